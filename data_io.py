@@ -0,0 +1,228 @@
+"""Shared data loading and cleaning for the flight map app pages."""
+
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import streamlit as st
+
+# On-disk cache of the cleaned frames, so restarts skip CSV parsing
+CACHE_DIR = Path('.parquet_cache')
+
+SOURCE_FILES = ('Summary_By_Origin_Airport.csv', 'airports_location.csv',
+                'AverageFare_USA.csv')
+
+def _source_key():
+    """Fingerprint of the source CSVs (mtime + size) for cache invalidation."""
+    parts = []
+    for path in SOURCE_FILES:
+        stat = os.stat(path)
+        parts.append(f'{path}:{stat.st_mtime_ns}:{stat.st_size}')
+    return hashlib.md5(';'.join(parts).encode()).hexdigest()
+
+def _dollars_to_float(series):
+    """Normalize a fare column to float32, stripping any '$'/',' formatting.
+
+    Clean columns parse as numeric at read time and pass straight through;
+    formatted ones are scrubbed with Arrow's vectorized literal-substring
+    kernels rather than a per-row Python converter.
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype('float32')
+    arr = pa.array(series.astype(str), type=pa.string())
+    arr = pc.replace_substring(pc.replace_substring(arr, '$', ''), ',', '')
+    return pd.to_numeric(arr.to_pandas(), errors='coerce').astype('float32')
+
+def _aggregate_annual(df):
+    """Sum passengers per (Year, city), carrying coords and airport code.
+
+    Factorizes the composite key once and accumulates each measure with a
+    single bincount pass, instead of pandas' generic multi-key hash-agg.
+    Produces the same frame as groupby(keys).agg(sum).
+
+    The coordinates and airport code are functionally dependent on the
+    city name (each name embeds its airport code), so only (Year, city)
+    goes into the key and the dependent columns are gathered from each
+    group's first row.
+    """
+    keys = ['Year', 'Origin City Name']
+    codes, uniques = pd.MultiIndex.from_frame(df[keys]).factorize()
+    n = len(uniques)
+
+    out = uniques.to_frame(index=False)
+    out.columns = keys
+    first_row = np.empty(n, dtype=np.int64)
+    first_row[codes[::-1]] = np.arange(len(codes) - 1, -1, -1)
+    for col in ['latitude', 'longitude']:
+        out[col] = df[col].to_numpy()[first_row]
+    out['Origin Airport Code'] = df['Origin Airport Code'].iloc[first_row].reset_index(drop=True)
+    for col in ['Total Passengers', 'Domestic Passengers', 'Outbound International Passengers']:
+        vals = df[col].to_numpy(dtype='float64', na_value=0.0)
+        out[col] = np.bincount(codes, weights=vals, minlength=n)
+
+    return out.sort_values(keys).reset_index(drop=True)
+
+def _rank_map_frame(data):
+    """Sort a map frame by passengers, attach min-rank, default the fare.
+
+    The frame is sorted descending, so min-rank (ties share the lowest
+    rank) is a searchsorted lookup rather than a Series.rank pass.
+    """
+    data = data.sort_values('Total Passengers', ascending=False).reset_index(drop=True)
+    v = data['Total Passengers'].to_numpy()
+    data['Rank'] = np.searchsorted(-v, -v, side='left') + 1
+    data['Avg Fare'] = data['Avg Fare'].fillna(100)
+    return data
+
+def _year_partitions(annual_data):
+    """Pre-bucket annual_data by Year, each bucket sorted and ranked,
+    so year filters are a dict lookup with no per-interaction pandas work."""
+    return {year: _rank_map_frame(group)
+            for year, group in annual_data.groupby('Year', sort=False)}
+
+def _option_lists(annual_data):
+    """Sorted year and city selectbox options, computed once at load time.
+
+    Sorting happens inside numpy/pandas (and numerically, for years)
+    before the values are materialized as Python objects for Streamlit.
+    """
+    year_options = np.sort(annual_data['Year'].unique()).astype(str).tolist()
+    city_options = annual_data['Origin City Name'].drop_duplicates().sort_values().tolist()
+    return year_options, city_options
+
+def _year_totals(annual_data):
+    """Per-year passenger totals for the header banner (plus the overall sum)."""
+    year_totals = annual_data.groupby('Year', sort=False)['Total Passengers'].sum()
+    return year_totals, int(year_totals.sum())
+
+def _top_cities_overall(annual_data, n=5):
+    """Top n cities by lifetime passengers (default fare-trend selection)."""
+    return annual_data.groupby('Origin City Name', sort=False)['Total Passengers'].sum() \
+                      .nlargest(n).index.tolist()
+
+def _derived_bundle(annual_data, all_years_data):
+    """Assemble the full load_data return tuple from the two base frames."""
+    return (annual_data, _rank_map_frame(all_years_data), _year_partitions(annual_data),
+            *_year_totals(annual_data), _top_cities_overall(annual_data),
+            *_option_lists(annual_data))
+
+# Load and clean data. cache_resource hands every rerun the same objects
+# by reference instead of st.cache_data's pickle round-trip and defensive
+# copy; callers must treat the returned frames as read-only (the map
+# builder already copies before mutating).
+@st.cache_resource
+def load_data():
+    annual_cache = CACHE_DIR / 'annual_data.parquet'
+    all_years_cache = CACHE_DIR / 'all_years_data.parquet'
+    key_file = CACHE_DIR / 'source_key'
+    source_key = _source_key()
+    if (annual_cache.exists() and all_years_cache.exists()
+            and key_file.exists() and key_file.read_text() == source_key):
+        annual_data = pd.read_parquet(annual_cache)
+        return _derived_bundle(annual_data, pd.read_parquet(all_years_cache))
+
+    # Only parse the columns the app consumes; thousands=',' lets the C
+    # parser produce numeric columns directly, so no post-parse
+    # str.replace cleanup pass is needed. (The summary file stays on the
+    # C engine because engine='pyarrow' does not support thousands=.)
+    df = pd.read_csv(
+        'Summary_By_Origin_Airport.csv',
+        usecols=['Year', 'Origin Airport Code', 'Origin City Name',
+                 'Total Passengers', 'Domestic Passengers',
+                 'Outbound International Passengers'],
+        dtype={'Origin Airport Code': 'category', 'Origin City Name': 'category'},
+        thousands=',')
+    airport_coords = pd.read_csv('airports_location.csv',
+                                 usecols=['code', 'latitude', 'longitude'],
+                                 engine='pyarrow')
+    fare = pd.read_csv('AverageFare_USA.csv',
+                       usecols=['Airport Code', 'Year', 'Average Fare ($)'],
+                       engine='pyarrow')
+
+    fare.rename(columns={
+        'Airport Code': 'Origin Airport Code',
+        'Average Fare ($)': 'Avg Fare'
+    }, inplace=True)
+
+    # Semi-join: the airport list is worldwide, but only codes that occur
+    # in the summary data can match, so drop the rest before the join
+    # (and before they inflate the shared category set below)
+    airport_coords = airport_coords[
+        airport_coords['code'].isin(df['Origin Airport Code'].unique())]
+
+    # Categorical key columns: merges and groupbys then work on small
+    # integer codes instead of repeated strings. A shared dtype keeps the
+    # airport-code categories aligned across all three frames.
+    code_dtype = pd.CategoricalDtype(airport_coords['code'].dropna().unique())
+    df['Origin Airport Code'] = df['Origin Airport Code'].astype(code_dtype)
+    airport_coords['code'] = airport_coords['code'].astype(code_dtype)
+    fare['Origin Airport Code'] = fare['Origin Airport Code'].astype(code_dtype)
+    df['Origin City Name'] = df['Origin City Name'].astype('category')
+
+    # Narrow dtypes: per-airport counts fit comfortably in int32 and fares
+    # in float32, halving the bytes every downstream aggregation touches
+    numeric_cols = ['Total Passengers', 'Domestic Passengers', 'Outbound International Passengers']
+    for col in numeric_cols:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('int32')
+    fare['Avg Fare'] = _dollars_to_float(fare['Avg Fare'])
+
+    # Year is normally already integer-like: coerce directly and only fall
+    # back to string slicing for the odd rows, instead of running a regex
+    # extract over every value
+    years = pd.to_numeric(df['Year'], errors='coerce')
+    bad = years.isna()
+    if bad.any():
+        years[bad] = pd.to_numeric(df.loc[bad, 'Year'].astype(str).str.slice(0, 4), errors='coerce')
+    df['Year'] = years
+    df = df.dropna(subset=['Year'])
+    df['Year'] = df['Year'].astype('int16')
+
+    # Index-based joins: the lookup tables are hashed once on their index
+    # and no duplicate 'code' key column gets appended to df
+    ac = airport_coords.set_index('code')[['latitude', 'longitude']].astype('float32')
+    df = df.join(ac, on='Origin Airport Code').dropna(subset=['latitude', 'longitude'])
+
+    annual_data = _aggregate_annual(df)
+
+    # Fares are unique per (airport, Year), so join them onto the
+    # aggregated frame (~thousands of rows) instead of the full
+    # airport-year frame — same Avg Fare values at a fraction of the
+    # join cardinality
+    fare_idx = fare.set_index(['Origin Airport Code', 'Year'])[['Avg Fare']]
+    annual_data = annual_data.join(fare_idx, on=['Origin Airport Code', 'Year'])
+    annual_data = annual_data.drop(columns='Origin Airport Code')
+
+    # The aggregation kernel works in float64; shrink the hot aggregate
+    # frame back down (city-year and lifetime sums still fit int32)
+    annual_data['Year'] = annual_data['Year'].astype('int16')
+    for col in numeric_cols:
+        annual_data[col] = annual_data[col].astype('int32')
+    annual_data[['latitude', 'longitude']] = annual_data[['latitude', 'longitude']].astype('float32')
+
+    # Precompute the "All Years" rollup once instead of re-aggregating
+    # inside create_map on every interaction. sort=False skips the group-key
+    # sort; the frame is re-sorted by passengers downstream anyway.
+    all_years_data = annual_data.groupby(['Origin City Name', 'latitude', 'longitude'],
+                                         sort=False).agg({
+        'Total Passengers': 'sum',
+        'Domestic Passengers': 'sum',
+        'Outbound International Passengers': 'sum',
+        'Avg Fare': 'mean'
+    }).reset_index()
+
+    CACHE_DIR.mkdir(exist_ok=True)
+    annual_data.to_parquet(annual_cache, engine='pyarrow', compression='zstd')
+    all_years_data.to_parquet(all_years_cache, engine='pyarrow', compression='zstd')
+    key_file.write_text(source_key)
+
+    return _derived_bundle(annual_data, all_years_data)
+
+# Helper to parse "Top N"
+def parse_topn(value):
+    if isinstance(value, str) and value.startswith("Top"):
+        return int(value.replace("Top", "").strip())
+    return None